@@ -1,23 +1,48 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
-from typing import Generator, List, Optional
+from typing import Callable, Dict, Generator, List, Optional, Tuple
 from enum import Enum
 
 import asyncio
-from collections import defaultdict, deque
-import datetime
-from functools import lru_cache
+import heapq
+from bisect import bisect
+from collections import Counter, deque
+from itertools import accumulate, chain, count
 from os import name, system
 import random
+import sys
 import time
 
 
-START_TIME = datetime.datetime.now()
+START_MONO = time.monotonic()
+# Game clock ticks are `time.monotonic_ns()`, this many per second
+NS = 1_000_000_000
 MENU = """=== MENU ===
 1. Upgrade Furniture
 2. Hire Staff
 0. Exit
 """
+# MENU as `print` would emit it. Plain ASCII, so the encoding of stdout doesn't matter
+_MENU_BYTES = (MENU + "\n").encode('ascii')
+
+# Erase screen and move cursor home. Windows consoles only honour escape codes once VT mode is on,
+# which any `system` call switches on for the rest of the process
+_CLEAR_SCREEN = "\x1b[2J\x1b[H"
+if name == 'nt':
+    system('')
+
+# Static part of `Office.display`, bound once so rebuilding the header is a single call
+_DISPLAY_HEAD = """{name} - {addr}
+Current Income: {income} / HyperSecond
+Current Budgets: {budgets}
+=== FACILITIES ===
+{f}
+=== STAFFS ===
+Leader\t\t: {leader}
+Manager\t\t: {manager}
+Consultant\t: {consultant}
+=== ACTIVE BUFFS & EFFECTS ===
+""".format
 
 class NotEnoughBudget(Exception):
     pass
@@ -25,36 +50,28 @@ class NotEnoughBudget(Exception):
 
 # Utility to create function run every x second without blocking main program
 async def create_schedule(func, interval: int = 5, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    # Deadlines advance by a fixed interval so time spent in func doesn't drift the schedule
+    next_t = loop.time() + interval
     while True:
-        await asyncio.gather(
-            asyncio.sleep(interval),
-            func(*args, **kwargs)
-        )
-
-
-# Utility to do exponentiation with integer only
-@lru_cache()
-def exponentiation(base: int, exp: int) -> int:
-    if (exp == 0):
-        return 1
-    if (exp == 1):
-        return base
-     
-    t = exponentiation(base, exp // 2);
-    t *= t
-     
-    if (exp % 2 == 0):
-        return t
-    else:
-        return base * t 
-
-
-# Utility to create incremental name with generator
-def name_generator():
-    cur_staff_id = 1
-    while True:
-        yield f"Staff-{cur_staff_id}"
-        cur_staff_id += 1
+        await asyncio.sleep(max(0, next_t - loop.time()))
+        next_t += interval
+        # Plain functions are called directly, coroutines are awaited
+        res = func(*args, **kwargs)
+        if asyncio.iscoroutine(res):
+            await res
+
+
+# Utility to format elapsed time since start as H:MM:SS. Reformatted at most once per second
+_elapsed_cache = (-1, "")
+def elapsed_str() -> str:
+    global _elapsed_cache
+    s = int(time.monotonic() - START_MONO)
+    if s != _elapsed_cache[0]:
+        h, rem = divmod(s, 3600)
+        m, sec = divmod(rem, 60)
+        _elapsed_cache = (s, f"{h}:{m:02d}:{sec:02d}")
+    return _elapsed_cache[1]
 
 
 class PositionType(Enum):
@@ -63,6 +80,21 @@ class PositionType(Enum):
     LEADER = 3
 
 
+# Cumulative weights for random rolls, precomputed so `random.choices` doesn't accumulate them on every call
+_BUFF_STACKS = [3, 2, 1]
+_BUFF_STACK_CUM = list(accumulate([0.5, 4.5, 95]))
+_UNIQUE_STACKS = [3, 2, 1]
+_UNIQUE_STACK_CUM = list(accumulate([0.1, 3, 96.9]))
+_POSITIONS = [PositionType.LEADER, PositionType.MANAGER, PositionType.CONSULTANT]
+_POSITION_CUM = list(accumulate([0.5, 3, 96.5]))
+_STAFF_AGES = range(18, 56)
+
+
+# Utility to pick one item by cumulative weights. Same draw as `random.choices(..., k=1)[0]` without building a list
+def weighted_pick(population: list, cum_weights: List[float], rand: Callable[[], float] = random.random):
+    return population[bisect(cum_weights, rand() * cum_weights[-1], 0, len(population) - 1)]
+
+
 class DisplayState:
     """
     Utility class for handling display state
@@ -75,12 +107,18 @@ class DisplayState:
         self._errors = None
         self._pending_clear = False
         self.__lock = asyncio.Lock()
+        self.__last_frame = None
 
     # Accessor in case result fails to get
     @property
     def result_input(self):
         return self.__result_input        
 
+    # Whether an input prompt is currently open
+    @property
+    def pending(self) -> bool:
+        return bool(self.__pending)
+
     async def get_input(self, input_msg: Optional[str] = None):
         """
         Utility to get input async. Will ignore if input already in progress
@@ -88,12 +126,20 @@ class DisplayState:
         `input_msg` will be ignored if string not supplied
         """
         if not self.__pending:
-            loop = asyncio.get_event_loop()
             self.__pending = True
             if input_msg is not None and isinstance(input_msg, str):
                 self._input_menu = input_msg
-            print(self._input_menu)
-            self.__result_input = await loop.run_in_executor(None, input, "Select Option -> ")
+            out = getattr(sys.stdout, 'buffer', None)
+            if self._input_menu is MENU and out is not None:
+                # Flush pending text first so the bytes land after it
+                sys.stdout.flush()
+                out.write(_MENU_BYTES)
+                out.flush()
+            else:
+                print(self._input_menu)
+            self.__result_input = await self._read_line("Select Option -> ")
+            # Typed input scrolled the screen past the last frame, so the next one must be redrawn
+            self.__last_frame = None
 
             try:
                 self.__result_input = int(self.__result_input)
@@ -107,35 +153,66 @@ class DisplayState:
         else:
             return None
     
+    async def _read_line(self, prompt: str) -> str:
+        """
+        Read one line from stdin without blocking the event loop.
+
+        Waits for the terminal to become readable on the loop itself instead of handing `input` to a
+        thread each prompt. A terminal only becomes readable once a full line is typed, so `readline`
+        won't block after that. Falls back to a thread when stdin is not a terminal or the loop
+        can't watch it (e.g. Windows proactor loop)
+        """
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        fd = None
+        if sys.stdin.isatty():
+            try:
+                fd = sys.stdin.fileno()
+                loop.add_reader(fd, lambda: fut.done() or fut.set_result(None))
+            except (NotImplementedError, OSError):
+                fd = None
+        if fd is None:
+            return await asyncio.to_thread(input, prompt)
+        print(prompt, end='', flush=True)
+        try:
+            await fut
+        finally:
+            loop.remove_reader(fd)
+        line = sys.stdin.readline()
+        if not line:
+            raise EOFError
+        return line.rstrip('\n')
+
     def set_error(self, error):
         self._errors = error
 
     # Utility for clear console screen. Usually called automatically
     def clear(self):
-        # for windows
-        if name == 'nt':
-            _ = system('cls')
-    
-        # for mac and linux(here, os.name is 'posix')
-        else:
-            _ = system('clear')
+        sys.stdout.write(_CLEAR_SCREEN)
+        sys.stdout.flush()
         
     async def display(self):
         """
-        Display the game info. Will automatically call `DisplayState.clear()`
+        Display the game info. Will automatically call `DisplayState.clear()` when the frame changed
         """
         async with self.__lock:
             if self._pending_clear:
                 return
             self._pending_clear = True
-        await asyncio.sleep(0.5)
-        self.clear()
-        print(self._office.display)
+        # Yield once so redraw requests made in the same loop iteration share one redraw
+        await asyncio.sleep(0)
+        frame = [self._office.display, "\n"]
         if self._errors is not None:
-            print("ERROR:", self._errors)
+            frame.append(f"ERROR: {self._errors}\n")
         if self.__pending:
-            print(self._input_menu)
-            print("Select Option -> ", end='', flush=True)
+            frame.append(f"{self._input_menu}\nSelect Option -> ")
+        frame = ''.join(frame)
+        # Skip the clear and write entirely when nothing on screen would change
+        if frame != self.__last_frame:
+            self.__last_frame = frame
+            self.clear()
+            sys.stdout.write(frame)
+            sys.stdout.flush()
         self._pending_clear = False
 
     # Utility to clear input. Normally should done automatically 
@@ -147,16 +224,38 @@ class DisplayState:
 
 class Buff(ABC):
     """
-    Abstract base class for any buff
+    Abstract base class for any buff. `Office.update_income` computes income only through `apply`
+
+    `name` is a class attribute and defaults to class name.
+    `BUCKET` is the label used to group buffs when the display is truncated. Defaults to `name`
     """
+    __slots__ = ()
+    name = ""
+    # Set on subclasses that only customise `__str__`, so `Office.display` renders them with `str`
+    _custom_str = False
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        if not cls.name:
+            cls.name = cls.__name__
+        if "BUCKET" not in cls.__dict__:
+            cls.BUCKET = cls.name
+        if "_str_at" in cls.__dict__:
+            cls._custom_str = False
+        elif "__str__" in cls.__dict__:
+            cls._custom_str = True
     
     @abstractmethod
-    def activate(self):
+    def apply(self, income: int) -> int:
+        """
+        Return `income` after this buff is applied. Must not write the office income itself,
+        `Office.update_income` does that. Other side effects are allowed (see `RewindTime`)
+        """
         pass
 
-    @property
-    def name(self) -> str:
-        return self.__class__.__name__
+    # String of buff at given time. `Office.display` passes one timestamp for all buffs
+    def _str_at(self, now: int) -> str:
+        return str(self)
 
     def __str__(self) -> str:
         return self.name
@@ -167,21 +266,26 @@ class StaticBuff(Buff):
     Represent buff that doesn't have duration (permanent).
     Usually stat up buff
 
-    If inherited for different stat buff, `activate` and `__str__` method must be overridden
+    If inherited for different stat buff, `apply` and `__str__` method must be overridden
     """
+    __slots__ = ("_amount", "_stack", "_office", "_factor", "_str_cache")
+    name = "Stats Buff"
+    BUCKET = "Stats Buff"
+
     def __init__(self, office: Office, amount: int, stack: int) -> None:
         super().__init__()
-        if not all(isinstance(x, int) for x in [amount, stack]):
-            raise TypeError("Amount and stack must be integer")
-        if not isinstance(office, Office):
-            raise TypeError("Office must be class of Office")
+        # Buffs are created on every skill tick, so validation is stripped under `python -O`
+        if __debug__:
+            if type(amount) is not int or type(stack) is not int:
+                raise TypeError("Amount and stack must be integer")
+            if not isinstance(office, Office):
+                raise TypeError("Office must be class of Office")
         self._amount = amount
         self._stack = stack
         self._office = office
-
-    @property
-    def name(self) -> str:
-        return "Stats Buff"
+        # Cached amount * stack, kept in sync by the setters since it's read on every income update
+        self._factor = amount * stack
+        self._str_cache: Optional[str] = None
 
     @property
     def amount(self) -> int:
@@ -189,9 +293,11 @@ class StaticBuff(Buff):
     
     @amount.setter
     def amount(self, val: int):
-        if not isinstance(val, int):
+        if __debug__ and not isinstance(val, int):
             raise TypeError("Value of amount must be integer")
         self._amount = val
+        self._factor = val * self._stack
+        self._str_cache = None
 
     @property
     def stack(self) -> int:
@@ -199,115 +305,129 @@ class StaticBuff(Buff):
     
     @stack.setter
     def stack(self, val: int):
-        if not isinstance(val, int):
+        if __debug__ and not isinstance(val, int):
             raise TypeError("Value of stack must be integer")
         self._stack = val
+        self._factor = self._amount * val
+        self._str_cache = None
 
-    # Default activate will goes increase the income directly
-    def activate(self):
-        self._office.income += self._office.income * (self._amount * self._stack)//500
+    def apply(self, income: int) -> int:
+        return income + income * self._factor//500
 
+    # Only changes with amount or stack, so formatted once until then
     def __str__(self) -> str:
-        return f"{self.name} x{self._stack} (INCOME UP {self._amount//5}%)"
+        if self._str_cache is None:
+            self._str_cache = f"{self.name} x{self._stack} (INCOME UP {self._amount//5}%)"
+        return self._str_cache
 
 
 class TimedBuff(StaticBuff):
     """
     Represent buff that has duration. Inherits attribute from `StaticBuff`
 
-    If inherited for different stat buff, `activate` and `__str__` method must be overridden
+    If inherited for different stat buff, `apply` and `_str_at(now)` method must be overridden.
+    `Office.display` renders buffs through `_str_at`. Overriding only `__str__` also works, at the cost of a clock read per buff
     """
+    __slots__ = ("_start", "_duration", "_state")
+    name = "Limited Buff"
+    BUCKET = "Timed Buff"
+
     def __init__(self, office: Office, amount: int, stack: int, duration: int, state: DisplayState) -> None:
         super().__init__(office, amount, stack)
-        if not isinstance(duration, int):
-            raise TypeError("Duration must be int")
-        if not isinstance(state, DisplayState):
-            raise TypeError("State must be class of DisplayState")
-        self._start = time.time()
+        if __debug__:
+            if type(duration) is not int:
+                raise TypeError("Duration must be int")
+            if not isinstance(state, DisplayState):
+                raise TypeError("State must be class of DisplayState")
+        self._start = time.monotonic_ns()
         self._duration = duration
         self._state = state
-        self._running = False
 
     @property
-    def name(self) -> str:
-        return "Limited Buff"
-
-    async def _do_timeout(self):
-        await asyncio.sleep(self._duration)
-        await self._office.collect()
-        self._office.remove_buff(self)
-        self._office.update_income()
-        await self._state.display()
-
-    def activate(self):
-        if not self._running:
-            asyncio.create_task(self._do_timeout())
-            self._running = True
-        super().activate()
+    def deadline(self) -> int:
+        """
+        Time when this buff expires, comparable to `time.monotonic_ns()`
+        """
+        return self._start + self._duration * NS
 
-    def __str__(self) -> str:
-        diff = time.time() - self._start
+    async def expire(self):
+        """
+        Collect, then remove this buff from the office. Called by `Office.watch_buff_expiry` once `deadline` passed
+        """
+        await self._office.remove_buff_and_recollect(self)
+        # Same as `timer_task`, don't wipe a line being typed
+        if not self._state.pending:
+            await self._state.display()
+
+    def _str_at(self, now: int) -> str:
+        diff = (now - self._start) / NS
         return f"{self.name} x{self._stack} (INCOME UP {self._amount//5}%) - {round(self._duration - diff)} seconds left"
 
+    def __str__(self) -> str:
+        return self._str_at(time.monotonic_ns())
+
 
 # Below is specific skill for staff
 class DoubleIncome(TimedBuff):
     """
     Buff that doubles the current income. When stacked, will be multiplied by stacks+1 instead
     """
-    @property
-    def name(self) -> str:
-        return "Rewind Time"
-    def activate(self):
-        if not self._running:
-            asyncio.create_task(self._do_timeout())
-            self._running = True
+    __slots__ = ()
+    name = "Rewind Time"
 
-        self._office.income += (self._office.income * (1 + self.stack))
+    def apply(self, income: int) -> int:
+        return income + income * (1 + self._stack)
 
 
 class RewindTime(TimedBuff):
     """
     Buff that freezes and rewind the current time and revert when time out
     """
-    @property
-    def name(self):
-        return "Rewind Time"
+    __slots__ = ("_original_time",)
+    name = "Rewind Time"
+
+    def __init__(self, office: Office, amount: int, stack: int, duration: int, state: DisplayState) -> None:
+        super().__init__(office, amount, stack, duration, state)
+        self._original_time: Optional[int] = None
 
-    async def _do_timeout(self, original_time: float):
-        await asyncio.sleep(self._duration * self._stack)
+    @property
+    def deadline(self) -> int:
+        return self._start + self._duration * self._stack * NS
+
+    async def expire(self):
+        if self._original_time is None:
+            # Never applied, so there is no rewind to revert
+            return await super().expire()
+        original_time = self._original_time
         # Before collecting, we make sure to set the froze claim time then revert it
-        self._office.last_claim = original_time - ((self._duration + self.amount) * self._stack)
-        await self._office.collect()
-        self._office.remove_buff(self)
-        self._office.update_income()
-        await self._state.display()
+        self._office.last_claim = original_time - ((self._duration + self._amount) * self._stack * NS)
+        await super().expire()
         # Back to original time of last claim
         self._office.last_claim = original_time
 
-    def activate(self):
-        if not self._running:
+    # Rewind doesn't change income
+    def apply(self, income: int) -> int:
+        if self._original_time is None:
             # Rewind time of last claim
-            self._office.last_claim = self._office.last_claim - ((self._duration + self.amount) * self._stack)
-            asyncio.create_task(self._do_timeout(self._office.last_claim))
-            self._running = True
+            self._original_time = self._office.last_claim - ((self._duration + self._amount) * self._stack * NS)
+            self._office.last_claim = self._original_time
+        return income
 
-    def __str__(self) -> str:
-        diff = time.time() - self._start
-        return f"{self.name} x{self._stack} - {round(((self._duration + self.amount) * self._stack) - diff)} seconds until back to present time"
+    def _str_at(self, now: int) -> str:
+        diff = (now - self._start) / NS
+        return f"{self.name} x{self._stack} - {round(((self._duration + self._amount) * self._stack) - diff)} seconds until back to present time"
 
 
 class ExtraBudget(TimedBuff):
     """
     Increase income and delayed increase budget
     """
-    @property
-    def name(self):
-        return "Extra Budget"
+    __slots__ = ()
+    name = "Extra Budget"
 
-    async def _do_timeout(self):
-        await super()._do_timeout()
-        self._office.budgets += self._office.budgets * (self._amount * self._stack)//500
+    async def expire(self):
+        await super().expire()
+        self._office.budgets += self._office.budgets * self._factor//500
 
 
 class Staff:
@@ -316,15 +436,18 @@ class Staff:
 
     When initialized, this will registered as office staff. Thus increasing the office staff income
     """
+    __slots__ = ("name", "_age", "__office", "__position")
+
     def __init__(self, name: str, age: int, office: Office, position: PositionType) -> None:
-        if not isinstance(name, str):
-            raise TypeError("Name must be string")
-        if not isinstance(age, int):
-            raise TypeError("Age must be integer")
-        if not isinstance(position, PositionType):
-            raise TypeError("Position must be instance of PositionType")
-        if not isinstance(office, Office):
-            raise TypeError("Office must be class Office")
+        if __debug__:
+            if type(name) is not str:
+                raise TypeError("Name must be string")
+            if type(age) is not int:
+                raise TypeError("Age must be integer")
+            if not isinstance(position, PositionType):
+                raise TypeError("Position must be instance of PositionType")
+            if not isinstance(office, Office):
+                raise TypeError("Office must be class Office")
 
         self.name = name
         self._age = age
@@ -341,66 +464,80 @@ class Staff:
         return self.__position
 
     def use_skill(self, state: DisplayState):
-        if not isinstance(state, DisplayState):
+        if __debug__ and not isinstance(state, DisplayState):
             raise TypeError("State must be from class DisplayState")
+        office = self.__office
+        randint = office._randint
+        rand = office._random
         # Position 2 staff have TimedBuff increase
         if self.position.value >= 2:
-            self.__office.add_buff(TimedBuff(self.__office, random.randint(5, 20), random.choices([3, 2, 1], weights=[0.5, 4.5, 95])[0], 10, state))
+            office.add_buff(TimedBuff(office, randint(5, 20), weighted_pick(_BUFF_STACKS, _BUFF_STACK_CUM, rand), 10, state))
         # Position 3 staff have 10% chance to trigger unique skill
-        if self.position.value >= 3 and random.random() < 0.10:
+        if self.position.value >= 3 and rand() < 0.10:
             # Since all the unique skill inherit TimedBuff, we can 'hack' using duck typing
-            tb = random.choice([DoubleIncome, RewindTime, ExtraBudget])
-            buff = tb(self.__office, random.randint(15, 30), random.choices([3, 2, 1], weights=[0.1, 3, 96.9])[0], 20, state)
-            self.__office.add_buff(buff)
-            self.__office.add_log(f"{self.name} Successfully trigger skill, created {buff.name} Buff")
+            tb = office._choice([DoubleIncome, RewindTime, ExtraBudget])
+            buff = tb(office, randint(15, 30), weighted_pick(_UNIQUE_STACKS, _UNIQUE_STACK_CUM, rand), 20, state)
+            office.add_buff(buff)
+            office.add_log(f"{self.name} Successfully trigger skill, created {buff.name} Buff")
 
 
 class Facility:
     """
     `Facility` class for `Office`. Usually predefined
     """
+    __slots__ = ("name", "_level", "_next_cost", "_base_cost", "__effects", "R")
+
     def __init__(self, name: str, base_cost: int,  effects: List[StaticBuff], r_percent: int) -> None:
-        if not isinstance(name, str):
-            raise TypeError("Name must be string")
-        if not isinstance(base_cost, int):
-            raise TypeError("Base cost must be int")
-        if not isinstance(r_percent, int):
-            raise TypeError("R Factors must be float")
-        if not isinstance(effects, list):
-            raise TypeError("Effects must be list")
+        if __debug__:
+            if type(name) is not str:
+                raise TypeError("Name must be string")
+            if type(base_cost) is not int:
+                raise TypeError("Base cost must be int")
+            if type(r_percent) is not int:
+                raise TypeError("R Factors must be float")
+            if not isinstance(effects, list):
+                raise TypeError("Effects must be list")
+            for e in effects:
+                if not isinstance(e, StaticBuff):
+                    raise TypeError("List of effects must be StaticBuff")
+                if isinstance(e, TimedBuff):
+                    raise NotImplementedError("Timed buff as effects is not supported yet")
         if r_percent < 1:
             raise ValueError("R Percents must be greater than 1")
-        for e in effects:
-            if not isinstance(e, StaticBuff):
-                raise TypeError("List of effects must be StaticBuff")
-            if isinstance(e, TimedBuff):
-                raise NotImplementedError("Timed buff as effects is not supported yet")
 
         self.name = name
         self._level = 1
-        self._cached_cost = (1, base_cost)
+        self._next_cost = base_cost
         self._base_cost = base_cost
         self.__effects = effects
         self.R = r_percent
     
     @property
     def cost(self) -> int:
-        if self._level == self._cached_cost[0]:
-            return self._cached_cost[1]
-        c = (self._base_cost * (exponentiation(self.R, self.level) - exponentiation(100, self.level))) // ((self.R * exponentiation(100, self.level-1)) - exponentiation(100, self.level))
-        self._cached_cost = (self._level, c)
-        return c
+        return self._next_cost
 
     @property
     def effects(self) -> List[StaticBuff]:
         return self.__effects.copy()
+
+    # Internal list without copying, used by `Office.update_effects`. Treat as read-only
+    @property
+    def _effects_ref(self) -> List[StaticBuff]:
+        return self.__effects
     
     @property
     def level(self) -> int:
         return self._level
 
+    # Cost only changes on upgrade, so it is computed here once instead of on every read
+    def _compute_cost(self) -> int:
+        p = pow(100, self._level-1)
+        pn = p * 100
+        return (self._base_cost * (pow(self.R, self._level) - pn)) // ((self.R * p) - pn)
+
     def upgrade(self) -> None:
         self._level += 1
+        self._next_cost = self._compute_cost()
         for x in self.__effects:
             x.amount += 4
             if self._level % 10 == 0:
@@ -411,6 +548,15 @@ class Office:
     """
     Main class for saving any state of game
     """
+    __slots__ = (
+        "name", "_address", "__base_income", "_income", "__budgets", "__facilities", "__logs",
+        "__effects", "__special_effects", "__buffs", "__plain_buffs", "__special_buffs",
+        "__staffs", "__last_claim", "__lock", "__buff_added", "__expiry_heap", "__expiry_seq",
+        "_next_staff_id", "_rng", "_randint", "_random", "_choice", "_choices", "_staff_cost",
+        "_staff_income", "_staff_counts", "__staff_info", "_effects_dirty",
+        "_facility_block_cache", "_display_dirty", "_display_head", "_display_tail"
+    )
+
     def __init__(self, name: str, address: str) -> None:
         if not isinstance(name, str):
             raise TypeError("Name must be string")
@@ -429,13 +575,28 @@ class Office:
             Facility("PC", 200, [StaticBuff(self, 10, 1), StaticBuff(self, 5, 2)], 200),
             Facility("Toilet", 350, [StaticBuff(self, 10, 1), StaticBuff(self, 10, 2), StaticBuff(self, 5, 3)], 300)
         ]
-        self.__logs: deque[str] = deque()
+        self.__logs: deque[str] = deque(maxlen=5)
         self.__effects: List[Buff] = []
-        self.__buffs: List[Buff] = []
+        # Whether any effect overrides `apply`, see `update_effects`
+        self.__special_effects = False
+        # Keyed by id so buffs can be removed by identity in O(1)
+        self.__buffs: Dict[int, Buff] = {}
+        # Active buffs split by how they affect income, see `add_buff`
+        self.__plain_buffs: Dict[int, StaticBuff] = {}
+        self.__special_buffs: Dict[int, Buff] = {}
         self.__staffs: List[Staff] = []
-        self.__last_claim = time.time()
+        self.__last_claim = time.monotonic_ns()
         self.__lock = asyncio.Lock()
-        self.__name_gen = name_generator()
+        self.__buff_added = asyncio.Event()
+        self.__expiry_heap: List[Tuple[int, int, TimedBuff]] = []
+        self.__expiry_seq = count()
+        self._next_staff_id = 1
+        # Own generator with bound methods cached, saves module and method lookups on every roll
+        self._rng = random.Random()
+        self._randint = self._rng.randint
+        self._random = self._rng.random
+        self._choice = self._rng.choice
+        self._choices = self._rng.choices
         self._staff_cost = 160
         self._staff_income = 0
         self._staff_counts = 0
@@ -444,17 +605,21 @@ class Office:
             "manager": 0,
             "leader": 0
         }
+        self._effects_dirty = True
+        self._facility_block_cache: Optional[str] = None
+        # Everything on screen except elapsed time and buffs, rebuilt only when `_display_dirty` is set
+        self._display_dirty = True
+        self._display_head = ""
+        self._display_tail = ""
 
         self.update_effects()
 
-    # Property of buffs using generator to 'save' memory
-    @property
-    def buffs(self) -> Generator[Buff, None, None]:
-        self.update_effects()
+    # Iterate effects then buffs using generator to 'save' memory. A method so it's clear each call walks both.
+    # Effects are only rebuilt on facility upgrade, not here
+    def get_buffs(self) -> Generator[Buff, None, None]:
         for x in self.__effects:
             yield x
-        for x in self.__buffs:
-            yield x
+        yield from self.__buffs.values()
 
     @property
     def facilities(self) -> List[Facility]:
@@ -466,9 +631,10 @@ class Office:
 
     @budgets.setter
     def budgets(self, val: int):
-        if not isinstance(val, int):
+        if __debug__ and not isinstance(val, int):
             raise TypeError("Budgets setter must be integer")
         self.__budgets = val
+        self._display_dirty = True
         
     @property
     def income(self):
@@ -476,9 +642,10 @@ class Office:
     
     @income.setter
     def income(self, val: int):
-        if not isinstance(val, int):
+        if __debug__ and not isinstance(val, int):
             raise TypeError("Income setter must be integer")
         self._income = val
+        self._display_dirty = True
 
     @property
     def staff_income(self) -> int:
@@ -486,18 +653,18 @@ class Office:
     
     @staff_income.setter
     def staff_income(self, val):
-        if not isinstance(val, int):
+        if __debug__ and not isinstance(val, int):
             raise TypeError("Staff income setter must be integer")
         self._staff_income = val
 
     @property
-    def last_claim(self) -> float:
+    def last_claim(self) -> int:
         return self.__last_claim
 
     @last_claim.setter
-    def last_claim(self, val: float):
-        if not isinstance(val, float):
-            raise TypeError("Last claim time setter must be float")
+    def last_claim(self, val: int):
+        if __debug__ and type(val) is not int:
+            raise TypeError("Last claim time setter must be int")
         self.__last_claim = val
 
     def get_buff_size(self) -> int:
@@ -513,61 +680,60 @@ class Office:
             return self._staff_cost
 
     def add_log(self, val: str):
-        tm = str((datetime.datetime.now() - START_TIME)).split('.')[0]
-        if not isinstance(val, str):
+        tm = elapsed_str()
+        if __debug__ and not isinstance(val, str):
             raise TypeError("Log must be string")
-        if len(self.__logs) >= 5:
-            self.__logs.popleft()
         self.__logs.append(val + f" - At {tm}")
+        self._display_dirty = True
     
     def clear_log(self):
         self.__logs.clear()
+        self._display_dirty = True
 
     @property
     def display(self):
-        f = ''.join([f"{i}) {x.name} - LVL {x.level} [{x.cost} for next upgrade]" + ('\n' if (i+1)%2 else '\t') for i, x in enumerate(self.__facilities, start=1)])
-        b = ''
+        if self._display_dirty:
+            # Facilities only change on upgrade, so the formatted block is cached until then
+            if self._facility_block_cache is None:
+                items = [f"{i}) {x.name} - LVL {x.level} [{x.cost} for next upgrade]" for i, x in enumerate(self.__facilities, start=1)]
+                # Two facilities per row
+                self._facility_block_cache = '\n'.join(['\t'.join(items[i:i+2]) for i in range(0, len(items), 2)])
+            staff_info = self.__staff_info
+            self._display_head = _DISPLAY_HEAD(
+                name=self.name, addr=self._address, income=self._income, budgets=self.__budgets,
+                f=self._facility_block_cache, leader=staff_info['leader'], manager=staff_info['manager'],
+                consultant=staff_info['consultant']
+            )
+            self._display_tail = "\n=== LOGS ===\n" + '\n'.join(self.__logs).strip()
+            self._display_dirty = False
+        # Buffs are rebuilt every call since timed buffs show a countdown
         sz = self.get_buff_size()
         # Truncate the output when buff amount more than 10
         if sz > 10:
-            hashmap = defaultdict(int)
-            for x in self.buffs:
-                if type(x) == StaticBuff:
-                    hashmap["Stats Buff"] += 1
-                elif type(x) == TimedBuff:
-                    hashmap["Timed Buff"] += 1
-                else:
-                    hashmap[x.name] += 1
-            for k, v in hashmap.items():
-                b += f"{k} - {v} Total\n"
+            counts = Counter(type(x).BUCKET for x in chain(self.__effects, self.__buffs.values()))
+            b = '\n'.join([f"{k} - {v} Total" for k, v in counts.items()])
         else:
-            b = '\n'.join([str(x) for x in self.buffs])
-        l = '\n'.join(self.__logs)
-        tm = str((datetime.datetime.now() - START_TIME)).split('.')[0]
-        return (  
-            f"Elapsed Time: {tm}\n"
-            f"{self.name} - {self._address}\n"
-            f"Current Income: {self.income} / HyperSecond\n"
-            f"Current Budgets: {self.__budgets}\n"
-            f"=== FACILITIES ===\n"
-            f"{f.strip()}\n"
-            f"=== STAFFS ===\n"
-            f"Leader\t\t: {self.__staff_info['leader']}\n"
-            f"Manager\t\t: {self.__staff_info['manager']}\n"
-            f"Consultant\t: {self.__staff_info['consultant']}\n"
-            f"=== ACTIVE BUFFS & EFFECTS ===\n"
-            f"{b.strip()}\n"
-            f"=== LOGS ===\n"
-            f"{l.strip()}"
-        )
+            now = time.monotonic_ns()
+            b = '\n'.join([str(x) if x._custom_str else x._str_at(now) for x in chain(self.__effects, self.__buffs.values())])
+        return ''.join([f"Elapsed Time: {elapsed_str()}\n", self._display_head, b.strip(), self._display_tail])
     
     def add_buff(self, buff: Buff):
         """
         Add buff to list buffs
         """
-        if not isinstance(buff, Buff):
+        if __debug__ and not isinstance(buff, Buff):
             raise TypeError("buff must be from class Buff")
-        self.__buffs.append(buff)
+        self.__buffs[id(buff)] = buff
+        # Buffs using the default stat formula only need their factor for income, the rest keep their own `apply`
+        if isinstance(buff, StaticBuff) and type(buff).apply is StaticBuff.apply:
+            self.__plain_buffs[id(buff)] = buff
+        else:
+            self.__special_buffs[id(buff)] = buff
+        if isinstance(buff, TimedBuff):
+            # Sequence number breaks deadline ties so buffs themselves are never compared
+            heapq.heappush(self.__expiry_heap, (buff.deadline, next(self.__expiry_seq), buff))
+        # Wake the expiry watcher since this buff may expire before the one it's waiting for
+        self.__buff_added.set()
 
 
     def remove_buff(self, buff: Buff):
@@ -588,35 +754,52 @@ class Office:
         """
         if not isinstance(buff, Buff):
             raise TypeError("buff must be from class Buff")
-        found = None
-        for i in range(len(self.__buffs)):
-            if self.__buffs[i] is buff:
-                found = i
-                break
-        if found is not None:
-            self.__buffs.pop(found)
-        else:
+        if self.__buffs.pop(id(buff), None) is None:
             raise ValueError("Value not found")
+        if self.__plain_buffs.pop(id(buff), None) is None:
+            self.__special_buffs.pop(id(buff))
     
     # Method to trigger all skill from staff
     def use_staff_skill(self, state: DisplayState):
-        if not isinstance(state, DisplayState):
+        if __debug__ and not isinstance(state, DisplayState):
             raise TypeError("State must be class of DisplayState")
         for s in self.__staffs:
             s.use_skill(state)
 
-    # Method to update effect from facilities. Usually done automatically
+    # Method to update effect from facilities. Done automatically on `upgrade_facility`
     def update_effects(self):
-        self.__effects.clear()
-        for x in self.__facilities:
-            self.__effects.extend(x.effects)
+        # Effects only change when a facility is upgraded
+        if not self._effects_dirty:
+            return
+        self._effects_dirty = False
+        # Refill in place from each facility's own list, no intermediate copies
+        self.__effects[:] = chain.from_iterable(x._effects_ref for x in self.__facilities)
+        # Same split as `add_buff`, effects with their own `apply` can't be folded into factors
+        self.__special_effects = any(type(x).apply is not StaticBuff.apply for x in self.__effects)
     
     # Method to update income from facilities. Usually done automatically
     def update_income(self):
-        self._income = self.__base_income
-        for x in self.buffs:
-            x.activate()
-        self._income += self._staff_income
+        # Accumulate into a local, buffs return the new income instead of writing through the office
+        inc = self.__base_income
+        if self.__special_effects:
+            for x in self.__effects:
+                inc = x.apply(inc)
+        else:
+            # Facility effects are plain stat buffs, so apply them inline without a method call each
+            for x in self.__effects:
+                inc += inc * x._factor//500
+        if self.__special_buffs:
+            # Order matters once a special buff is active, so go through every buff in order
+            for x in self.__buffs.values():
+                inc = x.apply(inc)
+        else:
+            # Factor read from the buff each time so `amount` and `stack` changes apply
+            for x in self.__plain_buffs.values():
+                inc += inc * x._factor//500
+        inc += self._staff_income
+        if inc != self._income:
+            self._income = inc
+            self._display_dirty = True
 
     def upgrade_facility(self):
         """
@@ -643,6 +826,9 @@ class Office:
                 raise NotEnoughBudget(f"Missing {self.__facilities[facility_index].cost - self.__budgets} budgets")
             self.__budgets -= self.__facilities[facility_index].cost
             self.__facilities[facility_index].upgrade()
+            self._effects_dirty = True
+            self._facility_block_cache = None
+            self._display_dirty = True
             self.update_effects()
 
     def hire_staff(self, bulk_10: bool = False):
@@ -653,57 +839,121 @@ class Office:
         cost = self.get_staff_cost(bulk_10)
         if cost > self.budgets:
             raise NotEnoughBudget(f"Missing {cost-self.budgets} budgets to add staff")
-        st = [
-            Staff(next(self.__name_gen), random.randint(18, 55), self, x) 
-            for x in random.choices([PositionType.LEADER, PositionType.MANAGER, PositionType.CONSULTANT], weights=[0.5, 3, 96.5], k=(10 if bulk_10 else 1))
-        ]
+        choices = self._choices
+        positions = choices(_POSITIONS, cum_weights=_POSITION_CUM, k=(10 if bulk_10 else 1))
+        # Single batched draw, uniform over the same ages as randint(18, 55)
+        ages = choices(_STAFF_AGES, k=len(positions))
         arr = []
-        s2 = 0
-        for x in st:
-            if x.position == PositionType.LEADER:
-                self.add_log("You successfully hired rank 3 Leader staff!")
-                self.__staff_info["leader"] += 1
-                arr.append(x)
-            elif x.position == PositionType.MANAGER:
-                self.__staff_info["manager"] += 1
-                s2 += 1
-                arr.append(x)
+        for staff_id, (x, age) in enumerate(zip(positions, ages), start=self._next_staff_id):
+            if x is PositionType.CONSULTANT:
+                # Here we don't create level 1 staff to save memory & looping time since their role is just adding into staff_income
+                self._staff_income += max(55-age, 10)
             else:
-                # Here we drop level 1 staff to save memory & looping time since their role is just adding into staff_income
-                self.__staff_info["consultant"] += 1
-            self._staff_counts += 1
-        if s2 > 0:
-            self.add_log(f"hired {s2} rank 2 Manager staff")
+                arr.append(Staff(f"Staff-{staff_id}", age, self, x))
+        self._next_staff_id += len(positions)
+        counts = Counter(positions)
+        for _ in range(counts[PositionType.LEADER]):
+            self.add_log("You successfully hired rank 3 Leader staff!")
+        if counts[PositionType.MANAGER] > 0:
+            self.add_log(f"hired {counts[PositionType.MANAGER]} rank 2 Manager staff")
+        self.__staff_info["leader"] += counts[PositionType.LEADER]
+        self.__staff_info["manager"] += counts[PositionType.MANAGER]
+        self.__staff_info["consultant"] += counts[PositionType.CONSULTANT]
+        self._staff_counts += len(positions)
         self.__budgets -= cost
         self._staff_cost = 180 * (3 ** (self._staff_counts//10))
+        self._display_dirty = True
         self.__staffs.extend(arr)
 
+    def next_buff_expiry(self) -> Optional[int]:
+        """
+        Earliest `deadline` among active timed buffs, or `None` when there is none
+        """
+        heap = self.__expiry_heap
+        # Entries of buffs removed some other way are dropped lazily here
+        while heap and self.__buffs.get(id(heap[0][2])) is not heap[0][2]:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    async def watch_buff_expiry(self):
+        """
+        Expire timed buffs as their deadline passes. Run this once as a task for the whole game.
+
+        Sleeps until the earliest deadline, or until a new buff is added, so there are no
+        wakeups while no timed buff is active
+        """
+        while True:
+            self.__buff_added.clear()
+            deadline = self.next_buff_expiry()
+            timeout = None if deadline is None else max(0, deadline - time.monotonic_ns()) / NS
+            try:
+                await asyncio.wait_for(self.__buff_added.wait(), timeout)
+                continue
+            except asyncio.TimeoutError:
+                pass
+            now = time.monotonic_ns()
+            heap = self.__expiry_heap
+            while heap and heap[0][0] <= now:
+                _, _, x = heapq.heappop(heap)
+                if self.__buffs.get(id(x)) is x:
+                    try:
+                        await x.expire()
+                    except Exception as e:
+                        # One failing buff must not stop the watcher for every other buff
+                        x._state.set_error(e)
+                        if self.__buffs.get(id(x)) is x:
+                            self.remove_buff(x)
+                            self.update_income()
+
     async def collect(self):
         """
         Collect from income. To handle race condition, this method use underlying `asyncio.Lock`
         """
+        # Claim is rounded to whole seconds, so nothing to collect yet. Skip the lock and income update
+        if time.monotonic_ns() - self.__last_claim < NS // 2:
+            return
         async with self.__lock:
-            cur = time.time()
-            self.update_effects()
+            self.__claim()
+
+    async def remove_buff_and_recollect(self, buff: Buff):
+        """
+        Collect with the buff still active, then remove it and update income, all under one lock
+        """
+        async with self.__lock:
+            self.__claim()
+            self.remove_buff(buff)
             self.update_income()
-            cl = self._income * round(cur - self.__last_claim)
-            if cl == 0:
-                return
-            self.add_log(f"Collect {cl}")
-            self.__budgets += self._income * round(cur -self.__last_claim)
-            self.__last_claim = cur
+
+    # Body of `collect`. Caller must hold the lock
+    def __claim(self):
+        cur = time.monotonic_ns()
+        self.update_income()
+        # Whole seconds since last claim, rounded half up
+        cl = self._income * ((cur - self.__last_claim + NS // 2) // NS)
+        if cl == 0:
+            return
+        self.add_log(f"Collect {cl}")
+        self.__budgets += cl
+        self.__last_claim = cur
+        self._display_dirty = True
 
 
 async def timer_task(state: DisplayState, office: Office):
     office.use_staff_skill(state)
     await office.collect()
-    await state.display()
+    # Redrawing under an open prompt would wipe what the user is typing
+    if not state.pending:
+        await state.display()
 
 
 async def main(name, address):
+    # Eager tasks run until their first await without a trip through the scheduler (Python 3.12+)
+    if hasattr(asyncio, "eager_task_factory"):
+        asyncio.get_running_loop().set_task_factory(asyncio.eager_task_factory)
     office = Office(name, address)
     state = DisplayState(office)
     asyncio.create_task(create_schedule(timer_task, 30, state, office))  # Automatic refresh every 30 seconds
+    asyncio.create_task(office.watch_buff_expiry())
     office.add_buff(TimedBuff(office, 70, 1, 30, state))
     upgrader = office.upgrade_facility()  # Set coroutine upgrade facility
     next(upgrader)
@@ -742,7 +992,15 @@ async def main(name, address):
             state.set_error("Invalid option")
 
 if __name__ == "__main__":
+    # uvloop is optional, fall back to default event loop when not installed.
+    # `uvloop.run` replaces the deprecated `uvloop.install` policy switch
+    try:
+        import uvloop
+    except ImportError:
+        run = asyncio.run
+    else:
+        run = uvloop.run
     # Kode utama disini
     name = input("Choose your office name: ")
     address = input("Choose your office address: ")
-    asyncio.run(main(name, address))
+    run(main(name, address))